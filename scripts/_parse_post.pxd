@@ -0,0 +1,8 @@
+# Cython type declarations for _parse_post.py (only used when compiling it)
+import cython
+
+@cython.locals(buf=bytearray, in_list=bint, line=str, stripped_line=str)
+cpdef str render_body(list lines)
+
+@cython.locals(text=str, lines=list, content_lines=list, formatted_body=str, tmp_path=str)
+cpdef dict parse_post(str path)
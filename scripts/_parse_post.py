@@ -0,0 +1,115 @@
+"""
+_parse_post.py – Markdown post parsing for convert_blog_to_json.py.
+
+Kept in its own module so it can optionally be compiled with Cython for
+faster cold rebuilds (types come from _parse_post.pxd):
+
+    cythonize -3 -i scripts/_parse_post.py
+
+When the compiled extension is absent this plain Python module is used.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+
+# Rendered bodies are cached here, keyed by a hash of the post content
+EXCERPT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "_excerpt_cache")
+
+# Bump whenever parse_post() output changes (invalidates .posts_cache.json)
+PARSER_VERSION = 1
+
+# Part of the excerpt cache key; bump whenever render_body() output changes
+RENDER_VERSION = 1
+
+
+def render_body(lines):
+    """Render the post body lines as <p>/<ul> HTML."""
+    # Consecutive "- item" lines become one <ul>, every other line a <p>.
+    # The HTML is built up in a bytearray and decoded once at the end.
+    buf = bytearray()
+    in_list = False
+
+    for line in lines:
+        stripped_line = line.strip()
+        if stripped_line.startswith("- "):
+            if not in_list:
+                buf += b"<ul>"
+                in_list = True
+            buf += b"<li>"
+            buf += stripped_line[2:].encode()
+            buf += b"</li>"
+        else:
+            # Close any open list before the paragraph
+            if in_list:
+                buf += b"</ul>"
+                in_list = False
+            buf += b"<p>"
+            buf += stripped_line.encode()
+            buf += b"</p>"
+
+    # Close a list that runs to the end of the post
+    if in_list:
+        buf += b"</ul>"
+
+    return buf.decode()
+
+
+def parse_post(path):
+    """Parse one Markdown post into its posts.json entry.
+
+    Returns None when the file is missing its #title / #date lines.
+    """
+    # Read the raw bytes and decode them once
+    with open(path, "rb") as f:
+        text = f.read().decode("utf-8", errors="ignore")
+
+    # Split on \r\n, \r and \n only, like text-mode readlines() (splitlines()
+    # would also break on \x0c, \x1c, \x85, U+2028, ...)
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    if not lines[-1]:
+        lines.pop()  # A trailing newline doesn't start another line
+
+    # Extract metadata
+    title = lines[0].replace("#title ", "").strip() if lines and lines[0].startswith("#title ") else None
+    date = lines[1].replace("#date ", "").strip() if len(lines) > 1 and lines[1].startswith("#date ") else None
+
+    # Skip files without a valid title and date
+    if not title or not date:
+        return None
+
+    # Remove metadata lines
+    content_lines = lines[2:]
+
+    # Reuse the rendered body if this exact content was converted before
+    # (every line is newline-terminated so an empty body and a blank line differ)
+    body_key = hashlib.sha256(f"{RENDER_VERSION}\n".encode() + "\n".join(content_lines + [""]).encode()).hexdigest()[:16]
+    body_cache_path = os.path.join(EXCERPT_CACHE_DIR, f"{body_key}.html")
+
+    if os.path.isfile(body_cache_path):
+        with open(body_cache_path, "rb") as f:
+            formatted_body = f.read().decode()
+    else:
+        formatted_body = render_body(content_lines)
+        # Write to a temp file and rename it into place, so an interrupted run
+        # or a concurrent worker never sees a partially written entry. The pid
+        # keeps temp names unique across pool workers and parallel runs.
+        os.makedirs(EXCERPT_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{body_cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(formatted_body.encode())
+            os.replace(tmp_path, body_cache_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    # Create post data
+    return {
+        "slug": os.path.basename(path)[:-3],
+        "title": title,
+        "date": date,
+        "excerpt": formatted_body
+    }
@@ -1,6 +1,10 @@
+from __future__ import annotations
+
 import os
 import json
-import re
+import argparse
+
+from _parse_post import EXCERPT_CACHE_DIR, PARSER_VERSION, RENDER_VERSION, parse_post
 
 # Get the repo root dynamically (assumes script is inside scripts/)
 REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
@@ -8,89 +12,143 @@ REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 # Define relative paths
 BLOG_DIR = os.path.join(REPO_ROOT, "blog-posts")
 OUTPUT_FILE = os.path.join(REPO_ROOT, "posts.json")
-
-# Try loading existing posts.json
-if os.path.exists(OUTPUT_FILE):
-    with open(OUTPUT_FILE, "r", encoding="utf-8") as f:
-        try:
-            existing_posts = json.load(f)
-        except json.JSONDecodeError:
-            existing_posts = []
-else:
-    existing_posts = []
-
-# Convert existing posts into a dictionary (for easy lookup)
-existing_posts_dict = {post["slug"]: post for post in existing_posts}
-
-# List to store updated post data
-updated_posts = []
-
-# Loop through each Markdown file in the directory
-for filename in os.listdir(BLOG_DIR):
-    if filename.endswith(".md"):
-        filepath = os.path.join(BLOG_DIR, filename)
-
-        with open(filepath, "r", encoding="utf-8", errors="ignore") as f:
-            lines = f.readlines()
-
-        # Extract metadata
-        title = lines[0].replace("#title ", "").strip() if lines and lines[0].startswith("#title ") else None
-        date = lines[1].replace("#date ", "").strip() if len(lines) > 1 and lines[1].startswith("#date ") else None
-
-        # Skip files without a valid title and date
-        if not title or not date:
-            print(f"Skipping {filename} (Missing title or date)")
+CACHE_FILE = os.path.join(REPO_ROOT, ".posts_cache.json")
+
+# Stored in the sidecar cache, which is discarded when it doesn't match.
+# Bump CACHE_VERSION whenever the sidecar layout changes.
+CACHE_VERSION = 1
+CACHE_STAMP = f"{CACHE_VERSION}.{PARSER_VERSION}.{RENDER_VERSION}"
+
+# Max number of cached excerpts kept on disk (oldest are trimmed first)
+EXCERPT_CACHE_MAX = 4096
+
+# Below this many changed files, starting a process pool costs more than it saves
+PARALLEL_MIN_FILES = 16
+
+
+def main() -> None:
+    # Parse command-line options
+    parser = argparse.ArgumentParser(description="Generate posts.json from the Markdown files in blog-posts/.")
+    parser.add_argument("--pretty", action="store_true", help="rewrite posts.json indented for human inspection")
+    args = parser.parse_args()
+
+    # Try loading existing posts.json
+    if os.path.exists(OUTPUT_FILE):
+        with open(OUTPUT_FILE, "r", encoding="utf-8") as f:
+            try:
+                existing_posts = json.load(f)
+            except json.JSONDecodeError:
+                existing_posts = []
+    else:
+        existing_posts = []
+
+    # Convert existing posts into a dictionary (for easy lookup)
+    existing_posts_dict = {post["slug"]: post for post in existing_posts}
+
+    # Try loading the sidecar cache (slug -> source mtime/size + parsed post),
+    # ignoring it if it was written by another version of the parser
+    post_cache = {}
+    if os.path.exists(CACHE_FILE):
+        with open(CACHE_FILE, "r", encoding="utf-8") as f:
+            try:
+                sidecar = json.load(f)
+            except json.JSONDecodeError:
+                sidecar = None
+        if isinstance(sidecar, dict) and sidecar.get("version") == CACHE_STAMP:
+            post_cache = sidecar["posts"]
+
+    # Cache entries for the files seen on this run (drops deleted posts)
+    updated_cache = {}
+
+    # Set when posts.json needs to be rewritten
+    dirty = False
+
+    # List to store updated post data
+    updated_posts = []
+
+    # List the Markdown files once as (slug, DirEntry) pairs; DirEntry carries
+    # the file type and caches stat()
+    with os.scandir(BLOG_DIR) as it:
+        entries = [(entry.name[:-3], entry) for entry in it if entry.name.endswith(".md") and entry.is_file(follow_symlinks=False)]
+
+    # Skip parsing when a file is unchanged since the last run. Size is
+    # compared too, since git/tar can restore an older mtime.
+    todo = []
+    for slug, entry in entries:
+        st = entry.stat()
+        cached = post_cache.get(slug)
+        if cached and cached["mtime"] == st.st_mtime_ns and cached["size"] == st.st_size:
+            updated_cache[slug] = cached
+        else:
+            todo.append((slug, entry))
+
+    # Parse the changed files, spreading them over all cores when there are
+    # enough of them to keep every worker busy
+    paths = [entry.path for _, entry in todo]
+    workers = os.cpu_count() or 1
+    if workers > 1 and len(paths) > PARALLEL_MIN_FILES:
+        # Imported here so small and incremental runs don't pay for loading multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        chunksize = max(1, len(paths) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parsed_posts = list(executor.map(parse_post, paths, chunksize=chunksize))
+    else:
+        parsed_posts = [parse_post(path) for path in paths]
+
+    for (slug, entry), post_data in zip(todo, parsed_posts):
+        st = entry.stat()
+        if post_data is None:
+            print(f"Skipping {entry.name} (Missing title or date)")
+        updated_cache[slug] = {"mtime": st.st_mtime_ns, "size": st.st_size, "post": post_data}
+
+    # Assemble posts.json in directory order
+    for slug, entry in entries:
+        filename = entry.name
+        post_data = updated_cache[slug]["post"]
+        if post_data is None:
             continue
 
-        # Remove metadata lines
-        content_lines = lines[2:]
-
-        # Extract unordered list items (- item)
-        list_items = []
-        formatted_text = []
-        
-        for line in content_lines:
-            stripped_line = line.strip()
-            if stripped_line.startswith("- "):
-                list_items.append(re.sub(r"^- ", "", stripped_line))
-            else:
-                # If there's a list collected, flush it into formatted_text
-                if list_items:
-                    formatted_text.append("<ul>" + "".join(f"<li>{item}</li>" for item in list_items) + "</ul>")
-                    list_items = []  # Reset list
-                formatted_text.append(f"<p>{stripped_line}</p>")  # Treat normal lines as paragraphs
-
-        # Flush any remaining list at the end of the document
-        if list_items:
-            formatted_text.append("<ul>" + "".join(f"<li>{item}</li>" for item in list_items) + "</ul>")
-
-        # Join the formatted text
-        formatted_body = "".join(formatted_text)
-
-        # Create post data
-        post_data = {
-            "slug": filename.replace(".md", ""),
-            "title": title,
-            "date": date.strip(),  # Ensure no whitespace issues
-            "excerpt": formatted_body
-        }
-
-        # Only update if the post has changed
-        if filename.replace(".md", "") in existing_posts_dict:
-            old_post = existing_posts_dict[filename.replace(".md", "")]
-            if old_post != post_data:
+        # Compare against posts.json, which may also have been edited or
+        # reverted since the cache entry was written
+        if slug in existing_posts_dict:
+            if existing_posts_dict[slug] != post_data:
                 print(f"Updating {filename} (Content changed)")
-                updated_posts.append(post_data)
-            else:
-                updated_posts.append(old_post)  # Keep the existing post unchanged
+                dirty = True
         else:
             print(f"Adding new post: {filename}")
-            updated_posts.append(post_data)
-
-# Write JSON only if changes were detected
-if updated_posts != existing_posts:
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(updated_posts, f, indent=2)
-    print(f"JSON successfully updated: {OUTPUT_FILE}")
-else:
-    print("No changes detected, JSON file remains the same.")
+            dirty = True
+        updated_posts.append(post_data)
+
+    # Every current post was matched against posts.json above, so a count
+    # mismatch means posts were deleted
+    if len(updated_posts) != len(existing_posts):
+        dirty = True
+
+    # Write JSON only if changes were detected (--pretty always rewrites it)
+    if dirty or args.pretty:
+        with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
+            if args.pretty:
+                json.dump(updated_posts, f, indent=2)
+            else:
+                json.dump(updated_posts, f, separators=(",", ":"))
+        print(f"JSON successfully updated: {OUTPUT_FILE}")
+    else:
+        print("No changes detected, JSON file remains the same.")
+
+    # Persist the sidecar cache for the next run
+    if todo or len(updated_cache) != len(post_cache):
+        with open(CACHE_FILE, "w", encoding="utf-8") as f:
+            json.dump({"version": CACHE_STAMP, "posts": updated_cache}, f, separators=(",", ":"))
+
+    # Trim the excerpt cache, dropping the oldest entries first
+    if todo and os.path.isdir(EXCERPT_CACHE_DIR):
+        cached_bodies = [os.path.join(EXCERPT_CACHE_DIR, name) for name in os.listdir(EXCERPT_CACHE_DIR)]
+        if len(cached_bodies) > EXCERPT_CACHE_MAX:
+            cached_bodies.sort(key=os.path.getmtime)
+            for path in cached_bodies[:-EXCERPT_CACHE_MAX]:
+                os.remove(path)
+
+
+if __name__ == "__main__":
+    main()